@@ -0,0 +1,319 @@
+import os
+import re
+import shutil
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+EVENT_ARCHIVE_DIR = "event_archive"
+# Columns stored as int32 codes into a per-column dictionary of distinct strings
+ENCODED_COLUMNS = ("game_id", "event_type", "player_id", "team_id", "description")
+NUMERIC_COLUMNS = {
+    "period": np.int16,
+    "clock": np.float32,  # Seconds left in the period
+}
+SEPARATOR = b"\0"
+
+
+def parse_clock(clock: Optional[str]) -> float:
+    """
+    Convert a game clock such as "11:36" or "0:04.2" to the number of seconds left in the period.
+
+    Returns:
+    - float: The seconds left, or NaN if the clock is missing or malformed.
+    """
+    try:
+        minutes, seconds = (clock or "").split(":")
+        return int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return float("nan")
+
+
+def event_credit(event: dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find the player and team credited with a play-by-play event.
+
+    The player comes from the event statistics. The team comes from the same statistic, or from
+    the event attribution for team events without a player.
+
+    Returns:
+    - tuple: The Sportradar IDs of the player and the team, each None if the event does not carry it.
+    """
+    statistic = next(
+        (statistic for statistic in event.get("statistics", []) if "player" in statistic),
+        {},
+    )
+    team = statistic.get("team") or event.get("attribution", {})
+    return statistic.get("player", {}).get("id"), team.get("id")
+
+
+def encode_dictionary(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack a dictionary of strings into a bytes blob and an offsets array, both storable as .npy.
+
+    Every value is UTF-8 encoded and followed by a separator, and the blob starts with one, so a
+    substring search can never match across two values. Value i is
+    blob[offsets[i]:offsets[i + 1] - 1].
+    """
+    encoded = [value.encode() for value in values]
+    offsets = np.empty(len(encoded) + 1, dtype=np.int64)
+    offsets[0] = len(SEPARATOR)
+    if encoded:
+        offsets[1:] = len(SEPARATOR) + np.cumsum([len(value) + len(SEPARATOR) for value in encoded])
+    blob = np.frombuffer(SEPARATOR + b"".join(value + SEPARATOR for value in encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def decode_dictionary(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Unpack a whole dictionary back into strings. Only needed when new rows are encoded."""
+    return [value.decode() for value in blob.tobytes().split(SEPARATOR)[1 : len(offsets)]]
+
+
+class EventArchive:
+    """
+    A per-season columnar archive of every play-by-play event, for ad-hoc vectorized queries.
+
+    Each column is a .npy file in the season's directory, memory-mapped on load so a query only
+    pages in the columns it touches. String columns are dictionary-encoded, and the dictionaries
+    are memory-mapped too, as a bytes blob plus an offsets array: a string filter is a search over
+    the blob, mapped back to codes with a binary search over the offsets.
+
+    Example - three-pointers made per player, without a loop over the events:
+        archive = EventArchive(2023)
+        archive.group_count("player_id", archive.filter(description_contains="makes three point"))
+    """
+
+    def __init__(self, season_year: int, directory: str = EVENT_ARCHIVE_DIR):
+        self.path = os.path.join(directory, str(season_year))
+        self.pending = []  # Rows of the games added since the last flush
+        self.pending_games = set()
+        self.columns = {}
+        self.blobs = {}
+        self.offsets = {}
+        self.load()
+
+    def load(self) -> None:
+        """Memory-map the stored columns and dictionaries, or start empty if there is no archive yet."""
+        # A flush interrupted between its two renames leaves only the previous archive, moved aside
+        old_path = self.path + ".old"
+        if not os.path.exists(self.path) and os.path.exists(old_path):
+            os.rename(old_path, self.path)
+            print(f"Restored the event archive {self.path} from an interrupted flush.")
+
+        try:
+            self.columns = {
+                column: np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode="r")
+                for column in ENCODED_COLUMNS + tuple(NUMERIC_COLUMNS)
+            }
+            for column in ENCODED_COLUMNS:
+                self.blobs[column] = np.load(os.path.join(self.path, f"{column}.values.npy"), mmap_mode="r")
+                self.offsets[column] = np.load(os.path.join(self.path, f"{column}.offsets.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            self.columns = {}
+            self.blobs = {}
+            self.offsets = {}
+
+    def __len__(self) -> int:
+        return len(self.columns["game_id"]) if self.columns else 0
+
+    def value(self, column: str, code: int) -> str:
+        """Decode a single code of a dictionary-encoded column."""
+        start, end = self.offsets[column][code], self.offsets[column][code + 1] - len(SEPARATOR)
+        return self.blobs[column][start:end].tobytes().decode()
+
+    def archived_games(self) -> Set[str]:
+        """Return the IDs of the games that have events in the archive."""
+        if not self.columns:
+            return set()
+        return {self.value("game_id", code) for code in np.unique(self.columns["game_id"])}
+
+    def add_game(self, game_id: str, periods_data: list) -> None:
+        """
+        Queue every event of a game for the archive. Nothing is written until flush is called.
+
+        Parameters:
+        - game_id (str): The ID of the game.
+        - periods_data (list): A list of period data containing information about events during the game.
+        """
+        for period in periods_data:
+            for event in period.get("events", []):
+                player_id, team_id = event_credit(event)
+                self.pending.append(
+                    {
+                        "game_id": game_id,
+                        "period": period.get("number", 0),
+                        "clock": parse_clock(event.get("clock")),
+                        "event_type": event.get("event_type", ""),
+                        "player_id": player_id or "",
+                        "team_id": team_id or "",
+                        "description": event.get("description", ""),
+                    }
+                )
+        self.pending_games.add(game_id)
+
+    def flush(self) -> None:
+        """
+        Merge the queued games into the stored columns and write the archive.
+
+        Dictionaries only ever grow, so the stored codes stay valid and only the new rows are
+        encoded. Rows of a game that is added again replace its old rows. The new archive is
+        written next to the old one and swapped in afterwards, so an interrupted flush never
+        leaves a half-written season behind.
+        """
+        if not self.pending:
+            return
+
+        dictionaries = {
+            column: decode_dictionary(self.blobs[column], self.offsets[column]) if self.columns else []
+            for column in ENCODED_COLUMNS
+        }
+        lookups = {column: {value: code for code, value in enumerate(values)} for column, values in dictionaries.items()}
+
+        new_columns = {}
+        for column in ENCODED_COLUMNS:
+            lookup = lookups[column]
+            values = dictionaries[column]
+            codes = np.empty(len(self.pending), dtype=np.int32)
+            for i, row in enumerate(self.pending):
+                value = row[column]
+                if value not in lookup:
+                    lookup[value] = len(values)
+                    values.append(value)
+                codes[i] = lookup[value]
+            new_columns[column] = codes
+        for column, dtype in NUMERIC_COLUMNS.items():
+            new_columns[column] = np.array([row[column] for row in self.pending], dtype=dtype)
+
+        if self.columns:
+            replaced_codes = [lookups["game_id"][game_id] for game_id in self.pending_games]
+            keep = ~np.isin(self.columns["game_id"], replaced_codes)
+            merged = {column: np.concatenate([self.columns[column][keep], new_columns[column]]) for column in new_columns}
+        else:
+            merged = new_columns
+
+        temporary_path = self.path + ".tmp"
+        old_path = self.path + ".old"
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        os.makedirs(temporary_path)
+        for column, values in merged.items():
+            np.save(os.path.join(temporary_path, f"{column}.npy"), values)
+        for column, values in dictionaries.items():
+            blob, offsets = encode_dictionary(values)
+            np.save(os.path.join(temporary_path, f"{column}.values.npy"), blob)
+            np.save(os.path.join(temporary_path, f"{column}.offsets.npy"), offsets)
+
+        # Drop the memory maps before their files are moved away
+        self.columns = {}
+        self.blobs = {}
+        self.offsets = {}
+        if os.path.exists(self.path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(self.path, old_path)
+        os.rename(temporary_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        print(f"Archived {len(self.pending)} events from {len(self.pending_games)} games.")
+        self.pending = []
+        self.pending_games = set()
+        self.load()
+
+    def _matching_codes(self, column: str, pattern: bytes) -> np.ndarray:
+        """Return the codes of every dictionary value containing the pattern, found by a search over the blob."""
+        blob = self.blobs[column]
+        # Matches come in order, so jumping to the next value after each hit finds every value once.
+        # The last byte of a match always lies within the matched value or its trailing separator.
+        codes = []
+        expression = re.compile(re.escape(pattern))
+        position = 0
+        match = expression.search(blob, position)
+        while match:
+            code = int(np.searchsorted(self.offsets[column], match.end() - 1, side="right")) - 1
+            codes.append(code)
+            position = int(self.offsets[column][code + 1]) - len(SEPARATOR)
+            match = expression.search(blob, position)
+        return np.array(codes, dtype=np.int32)
+
+    def filter(
+        self,
+        event_type: Optional[str] = None,
+        description_contains: Optional[str] = None,
+        game_id: Optional[str] = None,
+        player_id: Optional[str] = None,
+        team_id: Optional[str] = None,
+        period: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Select the events matching every given condition.
+
+        Args:
+            event_type: The Sportradar event type, e.g. "technicalfoul".
+            description_contains: A substring of the event description, e.g. "technical foul (Flopping)".
+            game_id: The ID of a game.
+            player_id: The ID of the player credited with the event.
+            team_id: The ID of the team credited with the event.
+            period: The period number.
+
+        Returns:
+            A boolean mask over the archived events.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if not self.columns:
+            return mask
+
+        for column, value in (
+            ("event_type", event_type),
+            ("game_id", game_id),
+            ("player_id", player_id),
+            ("team_id", team_id),
+        ):
+            if value is not None:
+                # Separators on both sides make the search an exact match
+                mask &= np.isin(self.columns[column], self._matching_codes(column, SEPARATOR + value.encode() + SEPARATOR))
+
+        if description_contains:
+            mask &= np.isin(self.columns["description"], self._matching_codes("description", description_contains.encode()))
+
+        if period is not None:
+            mask &= self.columns["period"] == period
+
+        return mask
+
+    def group_count(self, column: str, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """
+        Count the selected events per value of a dictionary-encoded column, in descending order.
+
+        Args:
+            column: One of the dictionary-encoded columns, e.g. "player_id" or "game_id".
+            mask: A boolean mask as returned by filter. If None, every event is counted.
+
+        Returns:
+            A dictionary mapping each value of the column to its number of selected events.
+        """
+        if column not in ENCODED_COLUMNS:
+            raise ValueError(f"Cannot group by {column}, expected one of {ENCODED_COLUMNS}.")
+        if not self.columns:
+            return {}
+
+        codes = self.columns[column] if mask is None else self.columns[column][mask]
+        counts = np.bincount(codes)
+        order = np.argsort(counts)[::-1]
+        return {self.value(column, code): int(counts[code]) for code in order if counts[code]}
+
+    def rows(self, mask: np.ndarray) -> List[dict]:
+        """Decode the selected events back into dictionaries, one per event."""
+        if not self.columns:
+            return []
+
+        decoded = []
+        for i in np.flatnonzero(mask):
+            row = {column: self.value(column, self.columns[column][i]) for column in ENCODED_COLUMNS}
+            row["period"] = int(self.columns["period"][i])
+            row["clock"] = float(self.columns["clock"][i])
+            decoded.append(row)
+        return decoded
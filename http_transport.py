@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_CACHE_DIR = "http_cache"
+DEFAULT_TIMEOUT = (5, 30)  # Seconds to connect, seconds between two bytes of the response
+DEFAULT_DEADLINE = 60  # Seconds for the whole request, retries and body included
+POOL_MAXSIZE = 4
+DEFAULT_HEADERS = {
+    "accept-encoding": "gzip, deflate",
+    "user-agent": "FlopCounter",
+}
+
+
+class HttpTransport:
+    """
+    One shared HTTP transport for all Sportradar and Spotrac calls.
+
+    - A keep-alive session per host, so consecutive calls reuse the connection and its TLS handshake.
+    - Compressed transfer, connect and read timeouts, and a deadline on the whole call, so a server
+      trickling bytes just under the read timeout cannot stall an ingest either.
+    - ETag and Last-Modified revalidation for endpoints marked cacheable: the body is kept in
+      the cache directory and a 304 answer is served from there.
+    - Bytes over the wire, latency and revalidation hits accounted per host.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = HTTP_CACHE_DIR,
+        timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+        deadline: float = DEFAULT_DEADLINE,
+    ):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.deadline = deadline
+        self.sessions = {}
+        self.stats = {}
+
+    def session_for(self, host: str) -> requests.Session:
+        """Return the pooled session of a host, creating it on first use."""
+        if host not in self.sessions:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            # Only connection failures and overload answers are retried, a slow read is not.
+            # A long Retry-After is not honoured, the backoff stays within a few seconds.
+            # backoff_max needs urllib3 2, which requirements.txt pins.
+            retry = Retry(
+                total=2,
+                read=0,
+                backoff_factor=1,
+                backoff_max=4,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=["GET"],
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.sessions[host] = session
+        return self.sessions[host]
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        # The URL carries the API key, so only its hash ends up on disk
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return (
+            os.path.join(self.cache_dir, f"{key}.json"),
+            os.path.join(self.cache_dir, f"{key}.body"),
+        )
+
+    def _load_cached(self, url: str) -> Tuple[Dict[str, str], Optional[bytes]]:
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, "r") as file:
+                validators = json.load(file)
+            with open(body_path, "rb") as file:
+                return validators, file.read()
+        except (
+            FileNotFoundError,
+            json.JSONDecodeError,
+        ):
+            return {}, None
+
+    def _store_cached(self, url: str, response: requests.Response) -> None:
+        validators = {
+            header: response.headers[header] for header in ("ETag", "Last-Modified") if header in response.headers
+        }
+        if not validators:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._cache_paths(url)
+        # The body goes first, so the validators never point at a body that was not written
+        with open(body_path, "wb") as file:
+            file.write(response.content)
+        with open(meta_path, "w") as file:
+            json.dump(validators, file)
+
+    def _account(self, host: str, response: requests.Response, elapsed: float) -> None:
+        stats = self.stats.setdefault(
+            host,
+            {
+                "requests": 0,
+                "not_modified": 0,
+                "errors": 0,
+                "bytes": 0,
+                "seconds": 0.0,
+            },
+        )
+        stats["requests"] += 1
+        stats["seconds"] += elapsed
+        if response is None:
+            stats["errors"] += 1
+            return
+        if response.status_code == 304:
+            stats["not_modified"] += 1
+        # Bytes pulled off the socket, i.e. before decompression
+        try:
+            stats["bytes"] += response.raw.tell()
+        except AttributeError:
+            stats["bytes"] += len(response.content)
+
+    def _fetch(self, session: requests.Session, url: str, headers: Dict[str, str], outcome: list) -> None:
+        try:
+            response = session.get(url, headers=headers, timeout=self.timeout)
+            response.content  # Read the body inside the timed section
+            outcome.append(response)
+        except requests.exceptions.RequestException as error:
+            outcome.append(error)
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        cacheable: bool = False,
+    ) -> Optional[requests.Response]:
+        """
+        Make a GET request through the pooled session of the URL's host.
+
+        Parameters:
+        - url (str): The full URL to fetch.
+        - headers (dict): Extra headers to send with the request.
+        - cacheable (bool): Whether to revalidate against, and refresh, the cached copy of the URL.
+
+        Returns:
+        - requests.Response: The response, with a 304 answer turned into a 200 carrying the cached
+          body, or None if the request failed or timed out.
+        """
+        host = urlsplit(url).netloc
+        request_headers = dict(headers or {})
+        cached_body = None
+        if cacheable:
+            validators, cached_body = self._load_cached(url)
+            if cached_body is not None:
+                if "ETag" in validators:
+                    request_headers["if-none-match"] = validators["ETag"]
+                if "Last-Modified" in validators:
+                    request_headers["if-modified-since"] = validators["Last-Modified"]
+
+        start = time.perf_counter()
+        outcome = []
+        session = self.session_for(host)
+        worker = threading.Thread(
+            target=self._fetch,
+            args=(session, url, request_headers, outcome),
+            daemon=True,
+        )
+        worker.start()
+        worker.join(self.deadline)
+        if worker.is_alive():
+            # The worker keeps the connection it is stuck on, so later calls get a fresh session
+            self.sessions.pop(host, None)
+            outcome.append(requests.exceptions.Timeout(f"No complete response within {self.deadline} seconds"))
+
+        response = outcome[0]
+        if isinstance(response, requests.exceptions.RequestException):
+            self._account(host, None, time.perf_counter() - start)
+            print(f"Request to {host} failed: {response}")
+            return None
+        self._account(host, response, time.perf_counter() - start)
+
+        if cacheable:
+            if response.status_code == 304 and cached_body is not None:
+                response.status_code = 200
+                response._content = cached_body
+            elif response.status_code == 200:
+                self._store_cached(url, response)
+
+        return response
+
+    def print_stats(self) -> None:
+        """Print the number of requests, bytes over the wire and average latency per host."""
+        for host, stats in self.stats.items():
+            average_ms = stats["seconds"] / stats["requests"] * 1000 if stats["requests"] else 0
+            print(
+                f"{host}: {stats['requests']} requests ({stats['not_modified']} not modified, {stats['errors']} failed), "
+                f"{stats['bytes'] / 1024:.1f} KiB, {average_ms:.0f} ms average"
+            )
+
+
+# The transport shared by every module, so all of them draw from the same connection pools
+transport = HttpTransport()
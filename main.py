@@ -1,5 +1,6 @@
-import requests
+import argparse
 import json
+import os
 import time
 from typing import (
     Dict,
@@ -9,7 +10,21 @@ from typing import (
 )
 from datetime import datetime
 from bs4 import BeautifulSoup
+from event_archive import (
+    EventArchive,
+    event_credit,
+)
+from http_transport import transport
 from nba_schedule import NBASchedule
+from player_profiles import (
+    PlayerProfileCache,
+    enrich_flopping_counts,
+    save_flopping_report,
+)
+from rollups import (
+    FlopRollups,
+    compute_game_contributions,
+)
 
 API_KEY_FILE = "apikey.txt"
 FLOPPING_COUNTS_FILE = "flopping_counts_new.json"
@@ -49,14 +64,15 @@ def fetch_play_by_play_data(game_id: str, api_key: str) -> dict:
 
     headers = {"accept": "application/json"}
 
-    response = requests.get(full_url, headers=headers)
+    response = transport.get(full_url, headers=headers)
 
-    if response.status_code == 200:
+    if response is not None and response.status_code == 200:
         data = response.json()
         is_scheduled = data.get("status") == "scheduled"
         return data, is_scheduled
     else:
-        print(f"Error fetching data for game {game_id}: {response.status_code}")
+        status = response.status_code if response is not None else "no response"
+        print(f"Error fetching data for game {game_id}: {status}")
         return None, False
 
 
@@ -70,7 +86,8 @@ def extract_flopping_fouls(periods_data: list, game_date: str) -> list:
     - game_date (str): The date of the game in the format "%Y-%m-%d".
 
     Returns:
-    - list: A list of dictionaries containing player names who committed a flopping foul and the formatted game date.
+    - list: A list of dictionaries containing player names who committed a flopping foul, the formatted game date,
+      and the player's and team's Sportradar IDs (None if the event does not carry them).
     """
     flopping_players = []
     formatted_game_date = datetime.strptime(game_date, "%Y-%m-%d").strftime("%m/%d/%Y")
@@ -80,10 +97,13 @@ def extract_flopping_fouls(periods_data: list, game_date: str) -> list:
             for event in period["events"]:
                 if "description" in event and "technical foul (Flopping)" in event["description"]:
                     player_name = event["description"].split(" technical foul (Flopping)")[0]
+                    player_id, team_id = event_credit(event)
                     flopping_players.append(
                         {
                             "player": player_name,
                             "date": formatted_game_date,
+                            "player_id": player_id,
+                            "team_id": team_id,
                         }
                     )
 
@@ -170,6 +190,9 @@ def save_data(data: dict, filepath: str) -> None:
     """
     Save the data to a JSON file.
 
+    The data is written to a temporary file which then replaces the old one, so readers such as
+    the query service never see a half-written file.
+
     Parameters:
     - data (dict): The data to be saved.
     - filepath (str): The file path where the data will be saved.
@@ -177,8 +200,10 @@ def save_data(data: dict, filepath: str) -> None:
     Returns:
     - None
     """
-    with open(filepath, "w") as file:
+    temporary_filepath = filepath + ".tmp"
+    with open(temporary_filepath, "w") as file:
         json.dump(data, file, indent=4)
+    os.replace(temporary_filepath, filepath)
 
 
 def integrate_scraped_data(
@@ -251,8 +276,8 @@ def scrape_flopping_fouls(
         - player: The player's name
         - date: The date of the foul
     """
-    response = requests.get(SCRAPING_URL)
-    if response.status_code != 200:
+    response = transport.get(SCRAPING_URL, cacheable=True)
+    if response is None or response.status_code != 200:
         print("Failed to retrieve the webpage.")
         return []
 
@@ -310,6 +335,7 @@ def sort_flopping_counts_descending(
 ) -> None:
     """
     Sorts the counts of items in the given JSON file in descending order and saves the result back to the same file.
+    Like save_data, the sorted file replaces the old one in a single step.
 
     Args:
         filepath (str): The path to the JSON file to be sorted.
@@ -334,21 +360,172 @@ def sort_flopping_counts_descending(
         reverse=True,
     )
 
-    with open(filepath, "w") as file:
+    temporary_filepath = filepath + ".tmp"
+    with open(temporary_filepath, "w") as file:
         file.write("{\n")
         for i, (
             player,
             details,
         ) in enumerate(sorted_items):
-            json_string = f'"{player}": {json.dumps(details)}'
+            json_string = f"{json.dumps(player)}: {json.dumps(details)}"
             if i < len(sorted_items) - 1:
                 json_string += ","
             file.write(json_string + "\n")
         file.write("}\n")
+    os.replace(temporary_filepath, filepath)
 
     print("Flopping counts sorted and saved.")
 
 
+def save_derived_data(event_archive: EventArchive, flop_rollups: FlopRollups) -> None:
+    """
+    Flush the event archive and save the rollups, reporting a failure instead of raising it.
+
+    Parameters:
+    - event_archive (EventArchive): The archive holding the events of the games processed in this run.
+    - flop_rollups (FlopRollups): The rollups updated in this run.
+
+    Returns:
+    - None
+    """
+    try:
+        event_archive.flush()
+        flop_rollups.save_rollups()
+    except (OSError, ValueError) as error:
+        print(f"Error saving the event archive or rollups: {error}. Run with --backfill to recover.")
+
+
+def archived_flopping_fouls(event_archive: EventArchive, game_id: str, game_date: str) -> list:
+    """
+    Extracts the flopping fouls of a game from the event archive, without calling the API.
+
+    Parameters:
+    - event_archive (EventArchive): The archive holding the events of the game.
+    - game_id (str): The ID of the game.
+    - game_date (str): The date of the game in the format "%Y-%m-%d".
+
+    Returns:
+    - list: The fouls in the same format as extract_flopping_fouls returns them.
+    """
+    formatted_game_date = datetime.strptime(game_date, "%Y-%m-%d").strftime("%m/%d/%Y")
+    events = event_archive.rows(event_archive.filter(game_id=game_id, description_contains="technical foul (Flopping)"))
+
+    return [
+        {
+            "player": event["description"].split(" technical foul (Flopping)")[0],
+            "date": formatted_game_date,
+            "player_id": event["player_id"] or None,
+            "team_id": event["team_id"] or None,
+        }
+        for event in events
+    ]
+
+
+def backfill(limit: int) -> None:
+    """
+    Fill the event archive and rollups for games that were processed without them.
+
+    Processed games missing from the archive, e.g. games processed before the archive existed, are
+    fetched again, archived and rolled up. Archived games missing from the rollups are rolled up
+    from the archive without any API call, but without their officials, which are not archived.
+    The flopping counts are not touched, since these games are already counted. Calls are rate
+    limited like the main loop and capped by limit, so a backfill can be spread over several runs.
+
+    Parameters:
+    - limit (int): The maximum number of API calls to make.
+
+    Returns:
+    - None
+    """
+    nba_schedule = NBASchedule()
+    api_key = read_api_key(API_KEY_FILE)
+    processed_games = load_processed_games(PROCESSED_GAMES_FILE)
+    flop_rollups = FlopRollups()
+    event_archive = EventArchive(nba_schedule.schedule_data["season"]["year"])
+
+    missing_games = sorted(processed_games - event_archive.archived_games())
+    print(f"Games processed but not archived: {len(missing_games)}")
+
+    api_call_counter = 0
+
+    try:
+        for game_id in missing_games[:limit]:
+            (play_by_play_data, is_scheduled) = fetch_play_by_play_data(game_id, api_key)
+            api_call_counter += 1
+            print(f"API calls made: {api_call_counter}")
+            game = nba_schedule.get_game(game_id)
+            if play_by_play_data and "periods" in play_by_play_data and not is_scheduled and game:
+                periods_data = play_by_play_data["periods"]
+                event_archive.add_game(game_id, periods_data)
+                flopping_fouls = extract_flopping_fouls(periods_data, game["scheduled"].split("T")[0])
+                contributions = compute_game_contributions(game, flopping_fouls, play_by_play_data.get("officials"))
+                flop_rollups.apply_game(game_id, contributions)
+            else:
+                print(f"Game {game_id} is scheduled or data incomplete. Skipping.")
+            time.sleep(1.5)  # Delay due to API rate limit
+
+        unrolled_games = (processed_games & event_archive.archived_games()) - set(flop_rollups.games)
+        print(f"Games archived but not rolled up: {len(unrolled_games)}")
+        for game_id in unrolled_games:
+            game = nba_schedule.get_game(game_id)
+            if game:
+                flopping_fouls = archived_flopping_fouls(event_archive, game_id, game["scheduled"].split("T")[0])
+                flop_rollups.apply_game(game_id, compute_game_contributions(game, flopping_fouls))
+
+    except KeyboardInterrupt:
+        print("Interrupted! Saving progress before exiting...")
+
+    finally:
+        save_derived_data(event_archive, flop_rollups)
+
+        transport.print_stats()
+
+
+def rollback(game_id: str) -> None:
+    """
+    Take a game back out of the results, so the next run fetches and counts it again.
+
+    The game is removed from the rollups, and, if its events are archived, its flopping fouls are
+    removed from the counts and it is no longer marked as processed. Without archived events the
+    fouls to remove are unknown, so only the rollups are rolled back and the game stays processed;
+    a backfill then rolls it up again.
+
+    Parameters:
+    - game_id (str): The ID of the game to roll back.
+
+    Returns:
+    - None
+    """
+    nba_schedule = NBASchedule()
+    flopping_counts = load_existing_data(FLOPPING_COUNTS_FILE)
+    processed_games = load_processed_games(PROCESSED_GAMES_FILE)
+    flop_rollups = FlopRollups()
+    event_archive = EventArchive(nba_schedule.schedule_data["season"]["year"])
+
+    if not flop_rollups.rollback_game(game_id):
+        print(f"Game {game_id} was not rolled up.")
+
+    game = nba_schedule.get_game(game_id)
+    if game and game_id in processed_games and game_id in event_archive.archived_games():
+        for foul in archived_flopping_fouls(event_archive, game_id, game["scheduled"].split("T")[0]):
+            entry = flopping_counts.get(foul["player"])
+            if isinstance(entry, dict) and foul["date"] in entry["dates"]:
+                entry["dates"].remove(foul["date"])
+                entry["count"] -= 1
+                if entry["count"] == 0:
+                    del flopping_counts[foul["player"]]
+        processed_games.discard(game_id)
+        save_data(flopping_counts, FLOPPING_COUNTS_FILE)
+        sort_flopping_counts_descending(FLOPPING_COUNTS_FILE)
+    else:
+        print(f"Game {game_id} has no archived events, its flopping counts are left as they are.")
+
+    flop_rollups.save_rollups()
+    save_processed_games(processed_games, PROCESSED_GAMES_FILE)
+
+    print(f"Game {game_id} rolled back.")
+
+
 def main():
     """
     Main function that runs the program.
@@ -360,6 +537,9 @@ def main():
     api_key = read_api_key(API_KEY_FILE)
     flopping_counts = load_existing_data(FLOPPING_COUNTS_FILE)
     processed_games = load_processed_games(PROCESSED_GAMES_FILE)
+    profile_cache = PlayerProfileCache(season_year=nba_schedule.schedule_data["season"]["year"])
+    flop_rollups = FlopRollups()
+    event_archive = EventArchive(nba_schedule.schedule_data["season"]["year"])
 
     scraped_data = scrape_flopping_fouls(cutoff_date)
 
@@ -374,7 +554,9 @@ def main():
                     print(f"API calls made: {api_call_counter}")
                     if play_by_play_data and "periods" in play_by_play_data and not is_scheduled:
                         periods_data = play_by_play_data["periods"]
+                        event_archive.add_game(game_id, periods_data)
                         flopping_fouls = extract_flopping_fouls(periods_data, date)
+                        profile_cache.prefetch({foul["player"]: foul["player_id"] for foul in flopping_fouls if foul["player_id"]})
                         for foul in flopping_fouls:
                             player = foul["player"]
                             date_of_foul = foul["date"]
@@ -392,6 +574,12 @@ def main():
                                     "count": 1,
                                     "dates": [date_of_foul],
                                 }
+                        game = nba_schedule.get_game(game_id)
+                        if game:
+                            contributions = compute_game_contributions(
+                                game, flopping_fouls, play_by_play_data.get("officials")
+                            )
+                            flop_rollups.apply_game(game_id, contributions)
                         processed_games.add(game_id)
                     else:
                         print(f"Game {game_id} is scheduled or data incomplete. Skipping.")
@@ -399,6 +587,10 @@ def main():
 
         integrate_scraped_data(scraped_data, flopping_counts)
 
+        profile_cache.resolve_names(flopping_counts, nba_schedule.get_team_ids(), api_key)
+
+        profile_cache.refresh(api_key)
+
     except KeyboardInterrupt:
         print("Interrupted! Saving progress before exiting...")
 
@@ -406,12 +598,41 @@ def main():
         # These lines will run whether the script is interrupted or completes normally
         save_data(flopping_counts, FLOPPING_COUNTS_FILE)
 
+        # The archive and rollups go before the processed games. If they fail, the processed games
+        # are still saved, as they must match the counts above, and backfill picks the games up later.
+        save_derived_data(event_archive, flop_rollups)
+
         save_processed_games(processed_games, PROCESSED_GAMES_FILE)
 
+        profile_cache.save_profiles()
+
+        transport.print_stats()
+
         sort_flopping_counts_descending(FLOPPING_COUNTS_FILE)
 
+        save_flopping_report(enrich_flopping_counts(flopping_counts, profile_cache))
+
         print("Progress saved successfully.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Count flopping fouls in the NBA play-by-play data.")
+    parser.add_argument(
+        "--backfill",
+        type=int,
+        metavar="LIMIT",
+        help="Fetch up to LIMIT already processed games again to fill the event archive and rollups, instead of a normal run.",
+    )
+    parser.add_argument(
+        "--rollback",
+        metavar="GAME_ID",
+        help="Take a game back out of the counts and rollups, so the next run counts it again.",
+    )
+    args = parser.parse_args()
+
+    if args.rollback is not None:
+        rollback(args.rollback)
+    elif args.backfill is not None:
+        backfill(args.backfill)
+    else:
+        main()
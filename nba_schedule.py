@@ -1,12 +1,13 @@
 import json
 import datetime
-import requests
+from http_transport import transport
 
 
 class NBASchedule:
     def __init__(self):
         self.schedule_file_path = "nba_schedule.json"  # Hardcoded file path
         self.schedule_data = self.load_schedule()
+        self.games_by_id = {game["id"]: game for game in self.schedule_data.get("games", [])}
 
     def load_schedule(self):
         """Load the NBA schedule JSON data from the file."""
@@ -29,19 +30,35 @@ class NBASchedule:
 
         return game_ids_by_date
 
+    def get_team_ids(self):
+        """Return the IDs of the league's franchises, leaving out All-Star and Rising Stars teams."""
+        # Exhibition games carry a title; real franchises also play untitled regular season games
+        return sorted(
+            {
+                game[side]["id"]
+                for game in self.schedule_data.get("games", [])
+                if "title" not in game
+                for side in ("home", "away")
+            }
+        )
+
+    def get_game(self, game_id):
+        """Return the schedule entry (home, away, venue...) of a game, or None if it is not on the schedule."""
+        return self.games_by_id.get(game_id)
+
 
 def fetch_nba_schedule(api_key):
     url = f"https://api.sportradar.us/nba/trial/v8/en/games/2023/REG/schedule.json?api_key={api_key}"
 
     # Make the request
-    response = requests.get(url)
+    response = transport.get(url, cacheable=True)
 
-    if response.status_code == 200:
+    if response is not None and response.status_code == 200:
         # Save the response data in a JSON file with pretty formatting
         with open("nba_schedule.json", "w") as file:
             json.dump(response.json(), file, indent=4)
         print("Schedule saved successfully.")
-    else:
+    elif response is not None:
         print(f"Error: {response.status_code}")
 
 
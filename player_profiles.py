@@ -0,0 +1,361 @@
+import csv
+import json
+import re
+import time
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+from http_transport import transport
+
+PLAYER_PROFILES_FILE = "player_profiles.json"
+FLOPPING_REPORT_FILE = "flopping_report.csv"
+PROFILE_URL = "https://api.sportradar.us/nba/trial/v8/en/players/{player_id}/profile.json"
+ROSTER_URL = "https://api.sportradar.us/nba/trial/v8/en/teams/{team_id}/profile.json"
+PROFILE_TTL_SECONDS = 7 * 24 * 60 * 60  # Team, position and minutes only move slowly
+REFRESH_BATCH_SIZE = 25  # Profile calls count against the same monthly quota as play-by-play
+ROSTER_BATCH_SIZE = 10  # Roster calls per run, on top of the profile batch
+API_CALL_DELAY = 1.5  # Delay due to API rate limit
+
+
+def fetch_player_profile(player_id: str, api_key: str) -> Optional[dict]:
+    """
+    Fetch the profile of a single player from the Sportradar API.
+
+    Parameters:
+    - player_id (str): The Sportradar ID of the player.
+    - api_key (str): The API key for accessing the Sportradar API.
+
+    Returns:
+    - dict: The raw profile data, or None if an error occurs.
+    """
+    full_url = PROFILE_URL.format(player_id=player_id) + f"?api_key={api_key}"
+    headers = {"accept": "application/json"}
+
+    response = transport.get(full_url, headers=headers, cacheable=True)
+
+    if response is not None and response.status_code == 200:
+        return response.json()
+    else:
+        status = response.status_code if response is not None else "no response"
+        print(f"Error fetching profile for player {player_id}: {status}")
+        return None
+
+
+def fetch_team_roster(team_id: str, api_key: str) -> Optional[Dict[str, str]]:
+    """
+    Fetch the current roster of a team from the Sportradar team profile endpoint.
+
+    Parameters:
+    - team_id (str): The Sportradar ID of the team.
+    - api_key (str): The API key for accessing the Sportradar API.
+
+    Returns:
+    - dict: A dictionary mapping each player's full name to their Sportradar ID, or None if an error occurs.
+    """
+    full_url = ROSTER_URL.format(team_id=team_id) + f"?api_key={api_key}"
+    headers = {"accept": "application/json"}
+
+    response = transport.get(full_url, headers=headers, cacheable=True)
+
+    if response is not None and response.status_code == 200:
+        return {player["full_name"]: player["id"] for player in response.json().get("players", []) if "full_name" in player}
+    else:
+        status = response.status_code if response is not None else "no response"
+        print(f"Error fetching roster for team {team_id}: {status}")
+        return None
+
+
+def normalize_name(player_name: str) -> str:
+    """Normalize a player name for matching, e.g. "P.J. Washington Jr." and "PJ Washington Jr" match."""
+    return " ".join(re.sub(r"[.'’]", "", player_name).lower().split())
+
+
+def summarize_profile(profile_data: dict, season_year: Optional[int] = None) -> dict:
+    """
+    Reduce a raw player profile to the fields the reports normalize with.
+
+    Parameters:
+    - profile_data (dict): The raw profile as returned by the profile endpoint.
+    - season_year (int): The regular season to read minutes from. If None, the latest one is used.
+
+    Returns:
+    - dict: A dictionary with the player's name, team, team alias, position, games played and minutes.
+    """
+    team = profile_data.get("team", {})
+    summary = {
+        "name": profile_data.get("full_name"),
+        "team": team.get("name"),
+        "team_alias": team.get("alias"),
+        "position": profile_data.get("primary_position") or profile_data.get("position"),
+        "games_played": 0,
+        "minutes": 0.0,
+    }
+
+    seasons = [season for season in profile_data.get("seasons", []) if season.get("type") == "REG"]
+    if season_year is not None:
+        seasons = [season for season in seasons if season.get("year") == season_year]
+    if not seasons:
+        return summary
+
+    # A traded player has one entry per team in the same season, so sum them all up
+    latest_season = max(seasons, key=lambda season: season.get("year", 0))
+    for season_team in latest_season.get("teams", []):
+        totals = season_team.get("total", {})
+        summary["games_played"] += totals.get("games_played", 0)
+        summary["minutes"] += float(totals.get("minutes", 0))
+
+    return summary
+
+
+class PlayerProfileCache:
+    """
+    An in-memory table of player profiles, persisted to disk, where every entry expires after a TTL.
+
+    Entries are keyed by Sportradar player ID. Name lookups go through a name index, since the
+    flopping counts are keyed by the player name taken from the event description, which does not
+    always match the full name in the profile.
+    """
+
+    def __init__(
+        self,
+        filepath: str = PLAYER_PROFILES_FILE,
+        ttl_seconds: int = PROFILE_TTL_SECONDS,
+        season_year: Optional[int] = None,
+    ):
+        self.filepath = filepath
+        self.ttl_seconds = ttl_seconds
+        self.season_year = season_year  # The season the minutes are read from, to match the counts
+        cached = self.load_profiles()
+        self.profiles = cached.get("profiles", {})
+        self.name_index = cached.get("names", {})
+        self.rosters = cached.get("rosters", {})  # Team ID -> fetch time and player name -> ID
+        self.pending = set()  # Players seen in new fouls whose profile is missing or stale
+        self.last_call_at = 0.0  # Shared by the roster and profile calls, which use the same rate limit
+
+    def load_profiles(self) -> dict:
+        """Load the cached profiles and name index from the file, or start empty if it is missing or unreadable."""
+        try:
+            with open(self.filepath, "r") as file:
+                return json.load(file)
+        except (
+            FileNotFoundError,
+            json.JSONDecodeError,
+        ):
+            return {}
+
+    def save_profiles(self) -> None:
+        """Save the cached profiles and name index to the file."""
+        with open(self.filepath, "w") as file:
+            json.dump(
+                {
+                    "profiles": self.profiles,
+                    "names": self.name_index,
+                    "rosters": self.rosters,
+                },
+                file,
+                indent=4,
+            )
+
+    def is_stale(self, player_id: str, now: Optional[float] = None) -> bool:
+        """Return True if the player has no profile yet or its profile is older than the TTL."""
+        entry = self.profiles.get(player_id)
+        if entry is None:
+            return True
+        now = time.time() if now is None else now
+        return now - entry["fetched_at"] >= self.ttl_seconds
+
+    def stale_ids(self) -> List[str]:
+        """Return the IDs of all known players whose profile is missing or has expired, oldest first."""
+        now = time.time()
+        known_ids = set(self.profiles) | set(self.name_index.values())
+        stale = [player_id for player_id in known_ids if self.is_stale(player_id, now)]
+        return sorted(stale, key=lambda player_id: self.profiles.get(player_id, {}).get("fetched_at", 0))
+
+    def store(self, player_id: str, profile: dict) -> None:
+        """Put a summarized profile into the table and stamp it with the current time."""
+        self.profiles[player_id] = {
+            "fetched_at": time.time(),
+            "profile": profile,
+        }
+        if profile.get("name"):
+            self.name_index[profile["name"]] = player_id
+        self.pending.discard(player_id)
+
+    def prefetch(self, player_ids: Dict[str, str]) -> None:
+        """
+        Queue players who just appeared in new fouls, so the next refresh fetches them first.
+
+        The names are indexed right away, as they are the ones the flopping counts are keyed by.
+        Players whose cached profile is still fresh are not queued.
+
+        Parameters:
+        - player_ids (dict): A dictionary mapping player names to their Sportradar IDs.
+        """
+        now = time.time()
+        for player_name, player_id in player_ids.items():
+            self.name_index[player_name] = player_id
+            if self.is_stale(player_id, now):
+                self.pending.add(player_id)
+
+    def _wait_for_rate_limit(self, delay: float) -> None:
+        """Sleep until at least delay seconds have passed since the previous API call."""
+        remaining = self.last_call_at + delay - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.last_call_at = time.monotonic()
+
+    def resolve_names(
+        self,
+        player_names: Iterable[str],
+        team_ids: Iterable[str],
+        api_key: str,
+        batch_size: int = ROSTER_BATCH_SIZE,
+        delay: float = API_CALL_DELAY,
+    ) -> int:
+        """
+        Find the IDs of players known only by name, e.g. counted before IDs were recorded, or scraped from Spotrac.
+
+        The names are matched against the team rosters, which are cached with the same TTL as the
+        profiles. Rosters are only fetched while some names are unresolved, and at most batch_size of
+        them per run, so a name that matches no roster, e.g. a retired player, costs at most one
+        fetch of each roster per TTL, spread over several runs.
+
+        Parameters:
+        - player_names (iterable): The names to resolve.
+        - team_ids (iterable): The Sportradar IDs of the league's franchises.
+        - api_key (str): The API key for accessing the Sportradar API.
+        - batch_size (int): The maximum number of roster calls to make.
+        - delay (float): The number of seconds to wait between two calls.
+
+        Returns:
+        - int: The number of API calls made.
+        """
+        unresolved = {normalize_name(name): name for name in player_names if name not in self.name_index}
+        api_call_counter = 0
+        now = time.time()
+
+        for team_id in team_ids:
+            if not unresolved:
+                break
+            roster = self.rosters.get(team_id)
+            if roster is None or now - roster["fetched_at"] >= self.ttl_seconds:
+                if api_call_counter >= batch_size:
+                    continue
+                self._wait_for_rate_limit(delay)
+                players = fetch_team_roster(team_id, api_key)
+                api_call_counter += 1
+                if players is None:
+                    continue
+                roster = {"fetched_at": now, "players": players}
+                self.rosters[team_id] = roster
+
+            for full_name, player_id in roster["players"].items():
+                player_name = unresolved.pop(normalize_name(full_name), None)
+                if player_name:
+                    self.name_index[player_name] = player_id
+
+        print(f"Team rosters fetched: {api_call_counter}, players still unresolved: {len(unresolved)}")
+        return api_call_counter
+
+    def refresh(
+        self,
+        api_key: str,
+        batch_size: int = REFRESH_BATCH_SIZE,
+        delay: float = API_CALL_DELAY,
+    ) -> int:
+        """
+        Fetch one rate-limited batch of missing or expired profiles.
+
+        Players queued by prefetch go first, then the cached entries that expired the longest ago.
+        Players whose fetch fails keep their old entry and are retried on the next refresh.
+
+        Parameters:
+        - api_key (str): The API key for accessing the Sportradar API.
+        - batch_size (int): The maximum number of profile calls to make.
+        - delay (float): The number of seconds to wait between two calls.
+
+        Returns:
+        - int: The number of API calls made.
+        """
+        queue = sorted(self.pending) + [player_id for player_id in self.stale_ids() if player_id not in self.pending]
+        api_call_counter = 0
+
+        for player_id in queue[:batch_size]:
+            self._wait_for_rate_limit(delay)
+            profile_data = fetch_player_profile(player_id, api_key)
+            api_call_counter += 1
+            if profile_data:
+                self.store(player_id, summarize_profile(profile_data, self.season_year))
+
+        print(f"Player profiles refreshed: {api_call_counter}, still queued: {max(len(queue) - batch_size, 0)}")
+        return api_call_counter
+
+    def get(self, player_id: str) -> Optional[dict]:
+        """Return the cached profile for a player ID, or None if it was never fetched."""
+        entry = self.profiles.get(player_id)
+        return entry["profile"] if entry else None
+
+    def get_by_name(self, player_name: str) -> Optional[dict]:
+        """Return the cached profile for a player name, or None if it is unknown."""
+        player_id = self.name_index.get(player_name)
+        return self.get(player_id) if player_id else None
+
+
+def enrich_flopping_counts(
+    flopping_counts: Dict[str, dict],
+    profile_cache: PlayerProfileCache,
+) -> List[dict]:
+    """
+    Join the flopping counts against the in-memory profile table for reporting.
+
+    Players without a cached profile are still reported, with empty profile fields.
+
+    Args:
+        flopping_counts: The flopping counts keyed by player name.
+        profile_cache: The profile table to join against.
+
+    Returns:
+        A list of dictionaries, one per player, with the count, the profile fields and the
+        number of flops per 36 minutes played (None if the minutes are unknown).
+    """
+    report = []
+
+    for player_name, details in flopping_counts.items():
+        count = details["count"] if isinstance(details, dict) else details
+        profile = profile_cache.get_by_name(player_name) or {}
+        minutes = profile.get("minutes") or 0
+        report.append(
+            {
+                "player": player_name,
+                "count": count,
+                "team": profile.get("team"),
+                "position": profile.get("position"),
+                "minutes": minutes,
+                "flops_per_36": round(count * 36 / minutes, 3) if minutes else None,
+            }
+        )
+
+    return report
+
+
+def save_flopping_report(report: List[dict], filepath: str = FLOPPING_REPORT_FILE) -> None:
+    """
+    Save the enriched flopping counts to a CSV file, sorted by count in descending order.
+
+    Args:
+        report: The rows returned by enrich_flopping_counts.
+        filepath: The file path where the report will be saved.
+
+    Returns:
+        None
+    """
+    columns = ["player", "count", "team", "position", "minutes", "flops_per_36"]
+    with open(filepath, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        for row in sorted(report, key=lambda row: row["count"], reverse=True):
+            writer.writerow(row)
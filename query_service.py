@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+from urllib.parse import (
+    parse_qs,
+    unquote,
+    urlsplit,
+)
+
+from main import FLOPPING_COUNTS_FILE
+
+HOST = "127.0.0.1"
+PORT = 8080
+RELOAD_INTERVAL = 2  # Seconds between two checks of the counts file
+DEFAULT_TOP_N = 10
+MAX_CACHED_RESPONSES = 4096  # Bounds the memo against arbitrary query strings
+
+
+class Snapshot:
+    """
+    An immutable in-memory index over one version of the flopping counts.
+
+    Rendered responses are memoized per path, so a repeated query costs a dictionary lookup.
+    The snapshot is never modified once built; a reload builds a new one and swaps it in.
+    """
+
+    def __init__(self, flopping_counts: Dict[str, dict], version: Optional[tuple] = None):
+        self.version = version
+        self.players = {}
+        self.months = {}
+
+        for player_name, details in flopping_counts.items():
+            if not isinstance(details, dict):
+                details = {"count": details, "dates": []}
+            try:
+                count = int(details["count"])
+                parsed_dates = sorted(datetime.strptime(date, "%m/%d/%Y") for date in details.get("dates", []))
+            except (KeyError, TypeError, ValueError) as error:
+                print(f"Skipping malformed entry for {player_name}: {error!r}")
+                continue
+
+            self.players[player_name] = {
+                "player": player_name,
+                "count": count,
+                "dates": [date.strftime("%m/%d/%Y") for date in parsed_dates],
+            }
+            for date in parsed_dates:
+                month = date.strftime("%Y-%m")
+                self.months[month] = self.months.get(month, 0) + 1
+
+        # Lookups are case-insensitive, but names differing only in case are still separate players
+        self.names = {}
+        for player_name in self.players:
+            self.names.setdefault(player_name.lower(), player_name)
+        self.leaderboard = sorted(self.players.values(), key=lambda entry: (-entry["count"], entry["player"]))
+        self.months = dict(sorted(self.months.items()))
+        self.responses = {}
+
+    def render(self, path: str, query: Dict[str, list]) -> Tuple[int, Optional[bytes]]:
+        """Answer a query from the index. Returns the HTTP status and the JSON body."""
+        if path == "/leaderboard":
+            try:
+                top_n = int(query.get("n", [DEFAULT_TOP_N])[0])
+            except ValueError:
+                top_n = -1
+            if top_n < 0:
+                return 400, json.dumps({"error": "n must be a non-negative integer"}).encode()
+            return 200, json.dumps(
+                [{"player": entry["player"], "count": entry["count"]} for entry in self.leaderboard[:top_n]]
+            ).encode()
+
+        if path.startswith("/players/"):
+            player_name = unquote(path[len("/players/") :])
+            entry = self.players.get(player_name) or self.players.get(self.names.get(player_name.lower()))
+            if entry is None:
+                return 404, json.dumps({"error": "player not found"}).encode()
+            return 200, json.dumps(entry).encode()
+
+        if path == "/months":
+            return 200, json.dumps(self.months).encode()
+
+        return 404, json.dumps({"error": "unknown endpoint"}).encode()
+
+    def respond(self, target: str) -> Tuple[int, bytes, str]:
+        """Return the status, body and ETag for a request target, rendering it on first use."""
+        response = self.responses.get(target)
+        if response is None:
+            url = urlsplit(target)
+            status, body = self.render(url.path.rstrip("/") or "/", parse_qs(url.query))
+            response = (status, body, '"' + hashlib.sha1(body).hexdigest() + '"')
+            if len(self.responses) < MAX_CACHED_RESPONSES:
+                self.responses[target] = response
+        return response
+
+
+class FloppingCountsIndex:
+    """
+    Holds the current snapshot of the counts file and swaps in a new one when the file changes.
+
+    The ingest replaces the file in a single step (see save_data), so a reload only ever reads a
+    complete file. Requests keep reading the old snapshot until the new one is fully built.
+    """
+
+    def __init__(self, filepath: str = FLOPPING_COUNTS_FILE):
+        self.filepath = filepath
+        self.snapshot = Snapshot({})
+        self.failed_version = None  # The file version that last failed to load, so it is not retried
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Rebuild the snapshot if the counts file changed since the last load. Returns True if it was swapped.
+
+        An unreadable file, or one that does not hold a JSON object, keeps the current snapshot. It
+        is reported once and skipped until the file changes again.
+        """
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return False
+        # A replaced file has a new inode even if it was written within the same mtime tick
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if version in (self.snapshot.version, self.failed_version):
+            return False
+
+        try:
+            with open(self.filepath, "r") as file:
+                flopping_counts = json.load(file)
+            if not isinstance(flopping_counts, dict):
+                raise ValueError(f"expected a JSON object, got {type(flopping_counts).__name__}")
+        except (OSError, ValueError) as error:
+            self.failed_version = version
+            print(f"Could not load {self.filepath}, still serving the previous snapshot: {error}")
+            return False
+
+        self.snapshot = Snapshot(flopping_counts, version)
+        print(f"Loaded {len(self.snapshot.players)} players from {self.filepath}.")
+        return True
+
+    def watch(self, interval: float = RELOAD_INTERVAL) -> None:
+        """
+        Check the counts file for changes forever. Meant to run in a daemon thread.
+
+        A failed reload keeps the current snapshot and is retried on the next check, so one bad
+        write never stops the hot reload.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload()
+            except Exception as error:
+                print(f"Reloading {self.filepath} failed, still serving the previous snapshot: {error!r}")
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Serves the leaderboard, player history and per-month endpoints from the in-memory index."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so a client does not reconnect per query
+    disable_nagle_algorithm = True  # Headers and body go out in two writes, don't hold the second one back
+    index: FloppingCountsIndex = None
+
+    def do_GET(self) -> None:
+        status, body, etag = self.index.snapshot.respond(self.path)
+
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Logging every request would cost more than answering it
+        pass
+
+
+def serve(host: str = HOST, port: int = PORT, filepath: str = FLOPPING_COUNTS_FILE) -> None:
+    """
+    Start the read-only query service and reload the counts whenever an ingest rewrites them.
+
+    Endpoints:
+    - /leaderboard?n=10: The top N players by flopping count.
+    - /players/<name>: The count and dates of a single player (case-insensitive).
+    - /months: The number of flopping fouls per month.
+    """
+    QueryHandler.index = FloppingCountsIndex(filepath)
+    threading.Thread(target=QueryHandler.index.watch, daemon=True).start()
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving flopping counts on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
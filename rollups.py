@@ -0,0 +1,138 @@
+import json
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+
+ROLLUPS_FILE = "flopping_rollups.json"
+DIMENSIONS = ("team", "opponent", "venue", "home_away", "referee", "crew")
+
+
+def compute_game_contributions(
+    game: dict,
+    flopping_fouls: List[dict],
+    officials: Optional[List[dict]] = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Count the flopping fouls of a single game along every rollup dimension.
+
+    Fouls whose team is unknown only count towards the venue and officiating dimensions, as their
+    team, opponent and home or away side cannot be told.
+
+    Parameters:
+    - game (dict): The schedule entry of the game, with its home, away and venue.
+    - flopping_fouls (list): The fouls of the game, as returned by extract_flopping_fouls.
+    - officials (list): The officials listed in the play-by-play data, if any.
+
+    Returns:
+    - dict: A dictionary keyed by dimension, with values mapping each dimension key to its count in this game.
+    """
+    contributions = {dimension: {} for dimension in DIMENSIONS}
+    sides = {
+        game.get("home", {}).get("id"): ("home", game.get("home", {}), game.get("away", {})),
+        game.get("away", {}).get("id"): ("away", game.get("away", {}), game.get("home", {})),
+    }
+    venue = game.get("venue", {}).get("name")
+    referees = sorted(official["full_name"] for official in officials or [] if official.get("full_name"))
+    crew = " / ".join(referees)
+
+    for foul in flopping_fouls:
+        keys = {
+            "venue": [venue] if venue else [],
+            "referee": referees,
+            "crew": [crew] if crew else [],
+        }
+        if foul.get("team_id") and foul["team_id"] in sides:
+            home_away, team, opponent = sides[foul["team_id"]]
+            keys["team"] = [team.get("name")]
+            keys["opponent"] = [opponent.get("name")]
+            keys["home_away"] = [home_away]
+
+        for dimension, dimension_keys in keys.items():
+            for key in dimension_keys:
+                # A schedule entry without a team name must not leave a null key behind
+                if key is None:
+                    continue
+                contributions[dimension][key] = contributions[dimension].get(key, 0) + 1
+
+    return contributions
+
+
+class FlopRollups:
+    """
+    Materialized flopping foul counts by team, opponent, venue, home or away side and officials.
+
+    The contributions of every game are kept next to the totals, so a game can be applied again
+    (backfill) or taken out (rollback) without re-walking the other games. Only fouls from the
+    play-by-play data are rolled up, since the scraped fines carry no game.
+    """
+
+    def __init__(self, filepath: str = ROLLUPS_FILE):
+        self.filepath = filepath
+        stored = self.load_rollups()
+        self.games = stored.get("games", {})
+        self.rollups = stored.get("rollups", {dimension: {} for dimension in DIMENSIONS})
+
+    def load_rollups(self) -> dict:
+        """Load the rollups and per-game contributions from the file, or start empty if it is missing or unreadable."""
+        try:
+            with open(self.filepath, "r") as file:
+                return json.load(file)
+        except (
+            FileNotFoundError,
+            json.JSONDecodeError,
+        ):
+            return {}
+
+    def save_rollups(self) -> None:
+        """Save the rollups and per-game contributions to the file."""
+        with open(self.filepath, "w") as file:
+            json.dump(
+                {
+                    "games": self.games,
+                    "rollups": self.rollups,
+                },
+                file,
+                indent=4,
+            )
+
+    def _add(self, contributions: Dict[str, Dict[str, int]], sign: int) -> None:
+        for dimension, counts in contributions.items():
+            table = self.rollups.setdefault(dimension, {})
+            for key, count in counts.items():
+                table[key] = table.get(key, 0) + sign * count
+                if table[key] == 0:
+                    del table[key]
+
+    def apply_game(self, game_id: str, contributions: Dict[str, Dict[str, int]]) -> None:
+        """
+        Add the contributions of a game to the rollups.
+
+        If the game was applied before, its old contributions are rolled back first, so
+        backfilling a game never counts its fouls twice.
+        """
+        self.rollback_game(game_id)
+        self._add(contributions, 1)
+        self.games[game_id] = contributions
+
+    def rollback_game(self, game_id: str) -> bool:
+        """
+        Take the contributions of a game out of the rollups.
+
+        Returns:
+        - bool: True if the game had been applied, False otherwise.
+        """
+        contributions = self.games.pop(game_id, None)
+        if contributions is None:
+            return False
+        self._add(contributions, -1)
+        return True
+
+    def lookup(self, dimension: str, key: str) -> int:
+        """Return the number of flopping fouls for a key of a dimension, e.g. lookup("venue", "Ball Arena")."""
+        return self.rollups.get(dimension, {}).get(key, 0)
+
+    def table(self, dimension: str) -> Dict[str, int]:
+        """Return the whole rollup table of a dimension, sorted by count in descending order."""
+        return dict(sorted(self.rollups.get(dimension, {}).items(), key=lambda item: item[1], reverse=True))
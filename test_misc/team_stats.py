@@ -1,7 +1,12 @@
-import requests
 import csv
+import os
+import sys
 import time
 
+# http_transport.py lives in the repo root, one level up from this script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_transport import transport
+
 # Sample call:
 # https://api.sportradar.com/nba/trial/v8/en/seasons/2023/REG/teams/583eccfa-fb46-11e1-82cb-f4ce4684ea4c/statistics.json?api_key=788u3xku2bs4v37sukxcbbpy
 
@@ -47,8 +52,8 @@ def read_api_key(filepath):
 # Function to fetch seasonal data for a given team
 def fetch_seasonal_data(team_name, team_id, api_key):
     base_url = f'https://api.sportradar.com/nba/trial/v8/en/seasons/2023/REG/teams/{team_id}/statistics.json?api_key={api_key}'
-    response = requests.get(base_url)
-    if response.status_code == 200:
+    response = transport.get(base_url)
+    if response is not None and response.status_code == 200:
         data = response.json()
         totals = data.get('own_record', {}).get('total', {})
         selected_data = {key: totals.get(key) for key in ['games_played', 'field_goals_made', 'field_goals_att', 
@@ -56,7 +61,8 @@ def fetch_seasonal_data(team_name, team_id, api_key):
                                                           'assists', 'total_turnovers', 'steals', 'blocks']}
         return team_name, selected_data
     else:
-        print(f"Error fetching data for {team_name}: {response.status_code}")
+        status = response.status_code if response is not None else "no response"
+        print(f"Error fetching data for {team_name}: {status}")
         return team_name, None
 
 # Main script
@@ -82,4 +88,5 @@ with open('team_selected_totals.csv', 'w', newline='') as file:
         # Sleep for 1.5 seconds to adhere to the API rate limit
         time.sleep(1.5)
 
+transport.print_stats()
 print("Data fetching and CSV writing complete.")
\ No newline at end of file